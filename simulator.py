@@ -1,61 +1,86 @@
+import operator
+import re
+from array import array
+from itertools import starmap
+
 # Instruction Type Mappings
 I_TYPE = {
-    "addi": {"opcode": "0010011", "funct3": "000"},
-    "lw":   {"opcode": "0000011", "funct3": "010"},
-    "jalr": {"opcode": "1100111", "funct3": "000"}
+    "addi": {"opcode": 0b0010011, "funct3": 0b000},
+    "lw":   {"opcode": 0b0000011, "funct3": 0b010},
+    "jalr": {"opcode": 0b1100111, "funct3": 0b000}
 }
 
 R_TYPE = {
-    "add":  {"opcode": "0110011", "funct3": "000", "funct7": "0000000"},
-    "sub":  {"opcode": "0110011", "funct3": "000", "funct7": "0100000"},
-    "slt":  {"opcode": "0110011", "funct3": "010", "funct7": "0000000"},
-    "srl":  {"opcode": "0110011", "funct3": "101", "funct7": "0000000"},
-    "or":   {"opcode": "0110011", "funct3": "110", "funct7": "0000000"},
-    "and":  {"opcode": "0110011", "funct3": "111", "funct7": "0000000"}
+    "add":  {"opcode": 0b0110011, "funct3": 0b000, "funct7": 0b0000000},
+    "sub":  {"opcode": 0b0110011, "funct3": 0b000, "funct7": 0b0100000},
+    "slt":  {"opcode": 0b0110011, "funct3": 0b010, "funct7": 0b0000000},
+    "srl":  {"opcode": 0b0110011, "funct3": 0b101, "funct7": 0b0000000},
+    "or":   {"opcode": 0b0110011, "funct3": 0b110, "funct7": 0b0000000},
+    "and":  {"opcode": 0b0110011, "funct3": 0b111, "funct7": 0b0000000}
 }
 
 S_TYPE = {
-    "sw": {"opcode": "0100011", "funct3": "010"}
+    "sw": {"opcode": 0b0100011, "funct3": 0b010}
 }
 
 B_TYPE = {
-    "beq": {"opcode": "1100011", "funct3": "000"},
-    "bne": {"opcode": "1100011", "funct3": "001"}
+    "beq": {"opcode": 0b1100011, "funct3": 0b000},
+    "bne": {"opcode": 0b1100011, "funct3": 0b001}
 }
 
 J_TYPE = {
-    "jal": {"opcode": "1101111"}
+    "jal": {"opcode": 0b1101111}
 }
 
+# Field values used by the handlers, resolved once at import
+ADDI_OPCODE, ADDI_FUNCT3 = I_TYPE["addi"]["opcode"], I_TYPE["addi"]["funct3"]
+LW_OPCODE, LW_FUNCT3 = I_TYPE["lw"]["opcode"], I_TYPE["lw"]["funct3"]
+JALR_OPCODE, JALR_FUNCT3 = I_TYPE["jalr"]["opcode"], I_TYPE["jalr"]["funct3"]
+ADD_OPCODE = R_TYPE["add"]["opcode"]
+ADD_FUNCT3, ADD_FUNCT7 = R_TYPE["add"]["funct3"], R_TYPE["add"]["funct7"]
+SUB_FUNCT3, SUB_FUNCT7 = R_TYPE["sub"]["funct3"], R_TYPE["sub"]["funct7"]
+SLT_FUNCT3 = R_TYPE["slt"]["funct3"]
+SRL_FUNCT3 = R_TYPE["srl"]["funct3"]
+OR_FUNCT3 = R_TYPE["or"]["funct3"]
+AND_FUNCT3 = R_TYPE["and"]["funct3"]
+SW_OPCODE, SW_FUNCT3 = S_TYPE["sw"]["opcode"], S_TYPE["sw"]["funct3"]
+BEQ_OPCODE, BEQ_FUNCT3 = B_TYPE["beq"]["opcode"], B_TYPE["beq"]["funct3"]
+BNE_FUNCT3 = B_TYPE["bne"]["funct3"]
+JAL_OPCODE = J_TYPE["jal"]["opcode"]
+
+# Branch comparison for each B-type funct3, None where unsupported
+BRANCH_CONDITIONS = [None] * 8
+BRANCH_CONDITIONS[BEQ_FUNCT3] = operator.eq
+BRANCH_CONDITIONS[BNE_FUNCT3] = operator.ne
+
+# Encoded beq x0, x0, 0, used as the program halt; like any B-type with
+# rs1 = rs2 = x0 and a zero offset, it halts whatever its funct3
+HALT_WORD = 0x00000063
+HALT_MASK = 0xFFFF8FFF
+
+_valid_instruction = re.compile(r'[01]{32}').fullmatch
+
 def initialize_registers():
-    return {f'x{i}': 0 for i in range(32)}
+    return [0] * 32
 
 def initialize_memory(size=32):
-    return [0] * size
+    return array('I', [0]) * size  # packed unsigned 32-bit words
 
 def load_program(file_path, memory):
-    def validate_instruction(line):
-        if len(line) != 32:
-            return False
-        return all(c in '01' for c in line)
-
     try:
         with open(file_path, 'r') as file:
-            instructions = []
-            for line_num, line in enumerate(file, 1):
-                line = line.strip()
-                if not line:
-                    continue
-                if not validate_instruction(line):
-                    raise ValueError(f"Invalid instruction format at line {line_num}")
-                instructions.append(line)
-            
-            if len(instructions) > len(memory):
-                raise ValueError("Program exceeds memory capacity")
-            
-            for i, instr in enumerate(instructions):
-                memory[i] = int(instr, 2)
-            return True
+            lines = [line.strip() for line in file]
+
+        for line_num, line in enumerate(lines, 1):
+            if line and not _valid_instruction(line):
+                raise ValueError(f"Invalid instruction format at line {line_num}")
+
+        instructions = [int(line, 2) for line in lines if line]
+        if len(instructions) > len(memory):
+            raise ValueError("Program exceeds memory capacity")
+
+        memory[:len(instructions)] = array('I', instructions)
+        return True
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found")
         return False
@@ -63,181 +88,297 @@ def load_program(file_path, memory):
         print(f"Error loading program: {str(e)}")
         return False
 
-def binary_to_decimal(binary_str, bits=32):
-    if len(binary_str) > bits:
-        binary_str = binary_str[-bits:]  # Truncate to required bits
-    
-    if binary_str[0] == '1':  # Negative number
-        inverted = ''.join('1' if bit == '0' else '0' for bit in binary_str)
-        return -1 * (int(inverted, 2) + 1)
-    return int(binary_str, 2)
+def sign_extend(value, bits):
+    sign = 1 << (bits - 1)
+    return (value ^ sign) - sign
 
 def execute_r_type(instr, pc, registers, memory):
-    funct7 = instr[:7]
-    rs2 = int(instr[7:12], 2)
-    rs1 = int(instr[12:17], 2)
-    funct3 = instr[17:20]
-    rd = int(instr[20:25], 2)
-    opcode = instr[25:]
-
-    rs1_val = registers[f'x{rs1}']
-    rs2_val = registers[f'x{rs2}']
-
-    if funct3 == R_TYPE["add"]["funct3"]:
-        if funct7 == R_TYPE["add"]["funct7"]:
+    funct7 = (instr >> 25) & 0x7F
+    rs2 = (instr >> 20) & 0x1F
+    rs1 = (instr >> 15) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+    rd = (instr >> 7) & 0x1F
+
+    rs1_val = registers[rs1]
+    rs2_val = registers[rs2]
+
+    if funct3 == ADD_FUNCT3:
+        if funct7 == ADD_FUNCT7:
             result = rs1_val + rs2_val
-        elif funct7 == R_TYPE["sub"]["funct7"]:
+        elif funct7 == SUB_FUNCT7:
             result = rs1_val - rs2_val
         else:
-            raise ValueError(f"Unknown R-type funct7: {funct7}")
-    elif funct3 == R_TYPE["slt"]["funct3"]:
+            raise ValueError(f"Unknown R-type funct7: {funct7:07b}")
+    elif funct3 == SLT_FUNCT3:
         result = 1 if rs1_val < rs2_val else 0
-    elif funct3 == R_TYPE["srl"]["funct3"]:
+    elif funct3 == SRL_FUNCT3:
         result = rs1_val >> (rs2_val % 32)
-    elif funct3 == R_TYPE["or"]["funct3"]:
+    elif funct3 == OR_FUNCT3:
         result = rs1_val | rs2_val
-    elif funct3 == R_TYPE["and"]["funct3"]:
+    elif funct3 == AND_FUNCT3:
         result = rs1_val & rs2_val
     else:
-        raise ValueError(f"Unknown R-type funct3: {funct3}")
+        raise ValueError(f"Unknown R-type funct3: {funct3:03b}")
 
     write_register(registers, rd, result)
     return pc + 4
 
 def execute_i_type(instr, pc, registers, memory):
-    imm = binary_to_decimal(instr[:12], 12)
-    rs1 = int(instr[12:17], 2)
-    funct3 = instr[17:20]
-    rd = int(instr[20:25], 2)
-    opcode = instr[25:]
+    imm = sign_extend(instr >> 20, 12)
+    rs1 = (instr >> 15) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+    rd = (instr >> 7) & 0x1F
+    opcode = instr & 0x7F
 
-    rs1_val = registers[f'x{rs1}']
+    rs1_val = registers[rs1]
 
-    if opcode == I_TYPE["addi"]["opcode"] and funct3 == I_TYPE["addi"]["funct3"]:
+    if opcode == ADDI_OPCODE and funct3 == ADDI_FUNCT3:
         result = rs1_val + imm
-    elif opcode == I_TYPE["lw"]["opcode"] and funct3 == I_TYPE["lw"]["funct3"]:
+    elif opcode == LW_OPCODE and funct3 == LW_FUNCT3:
         addr = rs1_val + imm
         if 0 <= addr < len(memory) * 4:
             result = memory[addr // 4]
         else:
             raise ValueError(f"Invalid memory address: {addr:08x}")
-    elif opcode == I_TYPE["jalr"]["opcode"] and funct3 == I_TYPE["jalr"]["funct3"]:
+    elif opcode == JALR_OPCODE and funct3 == JALR_FUNCT3:
         write_register(registers, rd, pc + 4)
         return rs1_val + imm
     else:
-        raise ValueError(f"Unknown I-type opcode/funct3: {opcode}/{funct3}")
+        raise ValueError(f"Unknown I-type opcode/funct3: {opcode:07b}/{funct3:03b}")
 
     write_register(registers, rd, result)
     return pc + 4
 
 def execute_s_type(instr, pc, registers, memory):
-    imm_high = instr[:7]
-    rs2 = int(instr[7:12], 2)
-    rs1 = int(instr[12:17], 2)
-    funct3 = instr[17:20]
-    imm_low = instr[20:25]
-    opcode = instr[25:]
-
-    imm = binary_to_decimal(imm_high + imm_low, 12)
-    rs1_val = registers[f'x{rs1}']
-    rs2_val = registers[f'x{rs2}']
-
-    if opcode == S_TYPE["sw"]["opcode"] and funct3 == S_TYPE["sw"]["funct3"]:
+    rs2 = (instr >> 20) & 0x1F
+    rs1 = (instr >> 15) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+    opcode = instr & 0x7F
+
+    imm = sign_extend(((instr >> 25) << 5) | ((instr >> 7) & 0x1F), 12)
+    rs1_val = registers[rs1]
+    rs2_val = registers[rs2]
+
+    if opcode == SW_OPCODE and funct3 == SW_FUNCT3:
         addr = rs1_val + imm
         if 0 <= addr < len(memory) * 4:
             memory[addr // 4] = rs2_val
         else:
             raise ValueError(f"Invalid memory address: {addr:08x}")
     else:
-        raise ValueError(f"Unknown S-type opcode/funct3: {opcode}/{funct3}")
+        raise ValueError(f"Unknown S-type opcode/funct3: {opcode:07b}/{funct3:03b}")
 
     return pc + 4
 
 def execute_b_type(instr, pc, registers, memory):
-    imm_12 = instr[0]
-    imm_10_5 = instr[1:7]
-    rs2 = int(instr[7:12], 2)
-    rs1 = int(instr[12:17], 2)
-    funct3 = instr[17:20]
-    imm_4_1 = instr[20:24]
-    imm_11 = instr[24]
-    opcode = instr[25:]
-
-    imm = binary_to_decimal(imm_12 + imm_11 + imm_10_5 + imm_4_1 + '0', 13)
-    rs1_val = registers[f'x{rs1}']
-    rs2_val = registers[f'x{rs2}']
-
-    # Special case for halt (beq x0, x0, 0)
-    if rs1 == 0 and rs2 == 0 and imm == 0 and opcode == B_TYPE["beq"]["opcode"]:
-        return -1  # Halt signal
-
-    branch_taken = False
-    if funct3 == B_TYPE["beq"]["funct3"]:
-        branch_taken = (rs1_val == rs2_val)
-    elif funct3 == B_TYPE["bne"]["funct3"]:
-        branch_taken = (rs1_val != rs2_val)
-    else:
-        raise ValueError(f"Unknown B-type funct3: {funct3}")
+    rs2 = (instr >> 20) & 0x1F
+    rs1 = (instr >> 15) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+
+    imm = sign_extend(((instr >> 31) << 12)
+                      | (((instr >> 7) & 0x1) << 11)
+                      | (((instr >> 25) & 0x3F) << 5)
+                      | (((instr >> 8) & 0xF) << 1), 13)
 
-    return pc + (imm if branch_taken else 4)
+    branch_taken = BRANCH_CONDITIONS[funct3]
+    if branch_taken is None:
+        raise ValueError(f"Unknown B-type funct3: {funct3:03b}")
+
+    return pc + imm if branch_taken(registers[rs1], registers[rs2]) else pc + 4
 
 def execute_j_type(instr, pc, registers, memory):
-    imm_20 = instr[0]
-    imm_10_1 = instr[1:11]
-    imm_11 = instr[11]
-    imm_19_12 = instr[12:20]
-    rd = int(instr[20:25], 2)
-    opcode = instr[25:]
+    rd = (instr >> 7) & 0x1F
+    opcode = instr & 0x7F
 
-    imm = binary_to_decimal(imm_20 + imm_19_12 + imm_11 + imm_10_1 + '0', 21)
+    imm = sign_extend(((instr >> 31) << 20)
+                      | (((instr >> 12) & 0xFF) << 12)
+                      | (((instr >> 20) & 0x1) << 11)
+                      | (((instr >> 21) & 0x3FF) << 1), 21)
 
-    if opcode == J_TYPE["jal"]["opcode"]:
+    if opcode == JAL_OPCODE:
         write_register(registers, rd, pc + 4)
         return pc + imm
     else:
-        raise ValueError(f"Unknown J-type opcode: {opcode}")
+        raise ValueError(f"Unknown J-type opcode: {opcode:07b}")
 
 def write_register(registers, reg_num, value):
-    if reg_num != 0:  # x0 is hardwired to zero
-        registers[f'x{reg_num}'] = value & 0xFFFFFFFF  # 32-bit mask
+    if reg_num:  # x0 is hardwired to zero
+        registers[reg_num] = value & 0xFFFFFFFF  # 32-bit mask
+
+def execute_system(instr, pc, registers, memory):
+    return -1  # ECALL/EBREAK halt the simulation
+
+# Opcode -> handler dispatch table, indexed by the 7-bit opcode field
+DISPATCH = [None] * 128
+DISPATCH[ADD_OPCODE] = execute_r_type
+for fields in I_TYPE.values():
+    DISPATCH[fields["opcode"]] = execute_i_type
+DISPATCH[SW_OPCODE] = execute_s_type
+DISPATCH[BEQ_OPCODE] = execute_b_type
+DISPATCH[JAL_OPCODE] = execute_j_type
+DISPATCH[0b1110011] = execute_system
 
 def execute_instruction(instruction, pc, registers, memory):
-    opcode = instruction[25:]
+    handler = DISPATCH[instruction & 0x7F]
 
     try:
-        if opcode == R_TYPE["add"]["opcode"]:
-            return execute_r_type(instruction, pc, registers, memory)
-        elif opcode in {I_TYPE[op]["opcode"] for op in ["addi", "lw", "jalr"]}:
-            return execute_i_type(instruction, pc, registers, memory)
-        elif opcode == S_TYPE["sw"]["opcode"]:
-            return execute_s_type(instruction, pc, registers, memory)
-        elif opcode == B_TYPE["beq"]["opcode"]:
-            return execute_b_type(instruction, pc, registers, memory)
-        elif opcode == J_TYPE["jal"]["opcode"]:
-            return execute_j_type(instruction, pc, registers, memory)
-        elif opcode == "1110011":  # ECALL/EBREAK
-            return -1
-        else:
-            raise ValueError(f"Unknown opcode: {opcode}")
+        if handler is None:
+            raise ValueError(f"Unknown opcode: {instruction & 0x7F:07b}")
+        return handler(instruction, pc, registers, memory)
     except Exception as e:
         print(f"Error executing instruction at PC {pc:08x}: {str(e)}")
         return -2
 
-def format_registers(pc, registers):
-    pc_hex = f"{pc:08x}"
-    reg_lines = []
-    for i in range(32):
-        reg_val = registers[f'x{i}'] & 0xFFFFFFFF
-        reg_lines.append(f"x{i}:0b{reg_val:032b}")
-    return pc_hex + " " + " ".join(reg_lines)
+# Trace line template: PC followed by all 32 registers in binary
+_REG_TEMPLATE = "{:08x} " + " ".join(f"x{i}:0b{{:032b}}" for i in range(32))
+_MEM_TEMPLATE = "0x{:08X}:0b{:032b}"
+
+def format_trace(trace):
+    """Format (pc, x0, ..., x31) snapshots into trace lines; registers are
+    already held as unsigned 32-bit values."""
+    return list(starmap(_REG_TEMPLATE.format, trace))
 
 def format_memory(memory):
-    memory_dump = []
-    for i in range(len(memory)):
-        addr = 0x00010000 + i * 4
-        value = memory[i]
-        memory_dump.append(f"0x{addr:08X}:0b{value:032b}")
-    return memory_dump
+    addrs = range(0x00010000, 0x00010000 + len(memory) * 4, 4)
+    return list(map(_MEM_TEMPLATE.format, addrs, memory.tolist()))
+
+def report_memory_fault(pc, addr):
+    print(f"Error executing instruction at PC {pc:08x}: Invalid memory address: {addr:08x}")
+    return -2
+
+def translate_instruction(instr, pc, mem_end):
+    """Return Python source lines for one straight-line instruction, or None if
+    it has to go through the interpreter (control flow or unknown encoding)."""
+    opcode = instr & 0x7F
+    rd = (instr >> 7) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+    rs1 = (instr >> 15) & 0x1F
+    rs2 = (instr >> 20) & 0x1F
+
+    if opcode == ADD_OPCODE:
+        funct7 = (instr >> 25) & 0x7F
+        if funct3 == ADD_FUNCT3 and funct7 == ADD_FUNCT7:
+            expr = f"r[{rs1}] + r[{rs2}]"
+        elif funct3 == SUB_FUNCT3 and funct7 == SUB_FUNCT7:
+            expr = f"r[{rs1}] - r[{rs2}]"
+        elif funct3 == SLT_FUNCT3:
+            expr = f"int(r[{rs1}] < r[{rs2}])"
+        elif funct3 == SRL_FUNCT3:
+            expr = f"r[{rs1}] >> (r[{rs2}] % 32)"
+        elif funct3 == OR_FUNCT3:
+            expr = f"r[{rs1}] | r[{rs2}]"
+        elif funct3 == AND_FUNCT3:
+            expr = f"r[{rs1}] & r[{rs2}]"
+        else:
+            return None
+        return [f"r[{rd}] = ({expr}) & 0xFFFFFFFF"] if rd else []
+
+    if opcode == ADDI_OPCODE and funct3 == ADDI_FUNCT3:
+        imm = sign_extend(instr >> 20, 12)
+        return [f"r[{rd}] = (r[{rs1}] + {imm}) & 0xFFFFFFFF"] if rd else []
+
+    if opcode == LW_OPCODE and funct3 == LW_FUNCT3:
+        imm = sign_extend(instr >> 20, 12)
+        lines = [f"a = r[{rs1}] + {imm}",
+                 f"if not 0 <= a < {mem_end}: record(({pc}, *r)); return fault({pc}, a)"]
+        return lines + [f"r[{rd}] = m[a >> 2]"] if rd else lines
+
+    if opcode == SW_OPCODE and funct3 == SW_FUNCT3:
+        imm = sign_extend(((instr >> 25) << 5) | ((instr >> 7) & 0x1F), 12)
+        return [f"a = r[{rs1}] + {imm}",
+                f"if not 0 <= a < {mem_end}: record(({pc}, *r)); return fault({pc}, a)",
+                f"m[a >> 2] = r[{rs2}]"]
+
+    return None
+
+def translate_block(memory, start_pc, record):
+    """Compile the straight-line instructions at start_pc into block(r, m),
+    which runs them, records a trace snapshot after each one, and returns the
+    next pc (-2 on a memory fault).
+
+    Returns (block, end_pc, words), where words is the memory the block was
+    built from; block is None if start_pc must be interpreted."""
+    mem_end = len(memory) * 4
+    body = []
+    pc = start_pc
+    while pc < mem_end:
+        instr = memory[pc >> 2]
+        lines = translate_instruction(instr, pc, mem_end)
+        if lines is None:
+            break
+        body += lines
+        body.append(f"record(({pc}, *r))")
+        pc += 4
+        if instr & 0x7F == SW_OPCODE:
+            break  # A store may rewrite the instructions that follow
+
+    if pc == start_pc:
+        return None, start_pc + 4, memory[start_pc >> 2:(start_pc >> 2) + 1]
+
+    src = "def block(r, m, record=record, fault=fault):\n"
+    src += "".join(f"    {line}\n" for line in body)
+    src += f"    return {pc}\n"
+    namespace = {"record": record, "fault": report_memory_fault}
+    exec(compile(src, f"<block {start_pc:08x}>", "exec"), namespace)
+    return namespace["block"], pc, memory[start_pc >> 2:pc >> 2]
+
+def run_steps(memory, registers, pc, max_steps, trace):
+    """Execute from pc until halt, error or max_steps; returns (pc, halted, step_count)."""
+    # Bind hot names locally so the loop avoids global lookups
+    execute = execute_instruction
+    record = trace.append
+    mem_end = len(memory) * 4
+    halted = False
+    blocks = {}
+    step_count = 0
+
+    while not halted and 0 <= pc < mem_end:
+        if step_count > max_steps:
+            print(f"Stopped after {max_steps} steps (possible infinite loop)")
+            break
+
+        step_count += 1
+
+        if memory[pc >> 2] & HALT_MASK == HALT_WORD:
+            record((pc, *registers))
+            halted = True
+            break
+
+        try:
+            # Reuse the compiled block at pc unless its code has been overwritten
+            entry = blocks.get(pc)
+            if entry is None or memory[pc >> 2:entry[1] >> 2] != entry[2]:
+                entry = blocks[pc] = translate_block(memory, pc, record)
+            block, end_pc, _ = entry
+
+            # Run the whole block at once if it fits in the remaining steps
+            if block is not None and step_count + ((end_pc - pc) >> 2) - 2 <= max_steps:
+                new_pc = block(registers, memory)
+                if new_pc == -2:  # Error
+                    break
+                step_count += ((new_pc - pc) >> 2) - 1
+                pc = new_pc
+                continue
+
+            new_pc = execute(memory[pc >> 2], pc, registers, memory)
+
+            record((pc, *registers))
+
+            if new_pc == -1:  # Halt
+                halted = True
+            elif new_pc == -2:  # Error
+                break
+            else:
+                # A jump to itself never exits; longer loops are caught by max_steps
+                if new_pc == pc:
+                    print(f"Warning: Infinite loop detected at PC {pc:08x}")
+                    break
+                pc = new_pc
+        except Exception as e:
+            print(f"Error at PC {pc:08x}: {str(e)}")
+            break
+
+    return pc, halted, step_count
 
 def run_simulation(input_path, output_path):
     registers = initialize_registers()
@@ -247,47 +388,15 @@ def run_simulation(input_path, output_path):
         print("Failed to load program")
         return False
     
-    pc = 0
-    halted = False
-    last_pc = -1
     max_steps = 10000
-    step_count = 0
+    trace = []
 
     with open(output_path, 'w') as f:
-        while not halted and 0 <= pc < len(memory)*4:
-            if pc == last_pc:
-                print(f"Warning: Infinite loop detected at PC {pc:08x}")
-                break
-            if step_count > max_steps:
-                print(f"Stopped after {max_steps} steps (possible infinite loop)")
-                break
-
-            last_pc = pc
-            step_count += 1
-            
-            # Ensure x0 is always zero
-            registers['x0'] = 0
-            
-            try:
-                instr = memory[pc // 4]
-                instr_bin = bin(instr)[2:].zfill(32)
-                new_pc = execute_instruction(instr_bin, pc, registers, memory)
-                
-                f.write(format_registers(pc, registers) + "\n")
-                
-                if new_pc == -1:  # Halt
-                    halted = True
-                elif new_pc == -2:  # Error
-                    break
-                else:
-                    pc = new_pc
-            except Exception as e:
-                print(f"Error at PC {pc:08x}: {str(e)}")
-                break
+        _, halted, _ = run_steps(memory, registers, 0, max_steps, trace)
 
-        f.write("\nMemory:\n")
-        for line in format_memory(memory):
-            f.write(line + "\n")
+        if trace:
+            f.write("\n".join(format_trace(trace)) + "\n")
+        f.write("\nMemory:\n" + "\n".join(format_memory(memory)) + "\n")
 
     return halted
 